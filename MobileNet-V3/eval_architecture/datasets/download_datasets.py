@@ -1,27 +1,82 @@
 import os
+import shutil
+import subprocess
+import threading
 from tqdm import tqdm
 import requests
-import os
-from tqdm import tqdm
-import requests
+from requests.adapters import HTTPAdapter
+from concurrent.futures import ThreadPoolExecutor
 import tarfile
 
 RAW_DATA_PATH = "meta_acc_predictor/data"
 
+# 共享session：连接池+keep-alive，避免每个文件重新进行TCP/TLS握手
+session = requests.Session()
+_adapter = HTTPAdapter(pool_connections=8, pool_maxsize=8)
+session.mount("https://", _adapter)
+session.mount("http://", _adapter)
+
 
-def download_file(url, filename):
+def download_file(url, filename, session=session):
     """
     Helper method handling downloading large files from `url`
     to `filename`. Returns a pointer to `filename`.
     """
-    chunkSize = 1024
-    r = requests.get(url, stream=True)
-    with open(filename, "wb") as f:
+    # 1MiB的分块，避免每1KiB一次Python循环和write系统调用
+    chunkSize = 1024 * 1024
+    r = session.get(url, stream=True)
+    with open(filename, "wb", buffering=1024 * 1024) as f:
         pbar = tqdm(unit="B", total=int(r.headers["Content-Length"]))
         for chunk in r.iter_content(chunk_size=chunkSize):
-            if chunk:  # filter out keep-alive new chunks
+            pbar.update(len(chunk))
+            f.write(chunk)
+    return filename
+
+
+def parallel_download(url, filename, parts=6, session=session):
+    """
+    Download one large file from `url` to `filename` with `parts` parallel
+    HTTP Range requests. Falls back to `download_file` when the server does
+    not support byte ranges. Returns a pointer to `filename`.
+    """
+    head = session.head(url, allow_redirects=True)
+    size = int(head.headers.get("Content-Length", 0))
+    if size == 0:
+        return download_file(url, filename, session=session)
+
+    # 预分配整个文件，各线程直接按偏移量写入各自的分片
+    with open(filename, "wb") as f:
+        f.truncate(size)
+    pbar = tqdm(unit="B", total=size)
+    lock = threading.Lock()
+    fd = os.open(filename, os.O_WRONLY)
+
+    def fetch(start, end):
+        r = session.get(url, headers={"Range": f"bytes={start}-{end}"}, stream=True)
+        if r.status_code != 206:
+            raise IOError(f"Range request not honored for {url}")
+        offset = start
+        for chunk in r.iter_content(chunk_size=1024 * 1024):
+            os.pwrite(fd, chunk, offset)
+            offset += len(chunk)
+            with lock:
                 pbar.update(len(chunk))
-                f.write(chunk)
+
+    part_size = size // parts
+    try:
+        with ThreadPoolExecutor(max_workers=parts) as executor:
+            futures = []
+            for i in range(parts):
+                start = i * part_size
+                end = size - 1 if i == parts - 1 else (i + 1) * part_size - 1
+                futures.append(executor.submit(fetch, start, end))
+            for future in futures:
+                future.result()
+    except IOError:
+        # 服务器返回200而不是206，退回到串行下载
+        os.close(fd)
+        return download_file(url, filename, session=session)
+    os.close(fd)
     return filename
 
 
@@ -30,54 +85,83 @@ def download_pets():
     if not os.path.exists(dir_path):
         os.makedirs(dir_path)
 
-    full_name = os.path.join(dir_path, "test15.pth")
-    if not os.path.exists(full_name):
-        print(f"Downloading {full_name}\n")
-        download_file(
-            "https://www.dropbox.com/s/kzmrwyyk5iaugv0/test15.pth?dl=1", full_name
-        )
-        print("Downloading done.\n")
-    else:
-        print(f"{full_name} has already been downloaded. Did not download twice.\n")
-
-    full_name = os.path.join(dir_path, "train85.pth")
-    if not os.path.exists(full_name):
-        print(f"Downloading {full_name}\n")
-        download_file(
-            "https://www.dropbox.com/s/w7mikpztkamnw9s/train85.pth?dl=1", full_name
-        )
-        print("Downloading done.\n")
-    else:
-        print(f"{full_name} has already been downloaded. Did not download twice.\n")
+    urls = {
+        "test15.pth": "https://www.dropbox.com/s/kzmrwyyk5iaugv0/test15.pth?dl=1",
+        "train85.pth": "https://www.dropbox.com/s/w7mikpztkamnw9s/train85.pth?dl=1",
+    }
+    # 两个文件并行下载，重叠网络延迟
+    with ThreadPoolExecutor(max_workers=2) as executor:
+        futures = {}
+        for name, url in urls.items():
+            full_name = os.path.join(dir_path, name)
+            if not os.path.exists(full_name):
+                print(f"Downloading {full_name}\n")
+                futures[full_name] = executor.submit(download_file, url, full_name)
+            else:
+                print(
+                    f"{full_name} has already been downloaded. Did not download twice.\n"
+                )
+        for full_name, future in futures.items():
+            future.result()
+            print("Downloading done.\n")
 
 
 def download_aircraft():
     dir_path = RAW_DATA_PATH
     if not os.path.exists(dir_path):
         os.makedirs(dir_path)
+    url = "http://www.robots.ox.ac.uk/~vgg/data/fgvc-aircraft/archives/fgvc-aircraft-2013b.tar.gz"
     file_name = os.path.join(dir_path, "fgvc-aircraft-2013b.tar.gz")
+    untar_file_name = os.path.join(dir_path, "aircraft")
 
+    if os.path.exists(untar_file_name):
+        print(f"{untar_file_name} folder already exists. Did not untarring twice\n")
+        return
+
+    # 先解包到.partial临时目录，完整后再改名：中断（Ctrl-C、断电）只会留下
+    # .partial目录，后续运行不会把残缺的解包结果当作已完成而跳过
+    partial_name = untar_file_name + ".partial"
     if not os.path.exists(file_name):
-        print(f"Downloading {file_name}\n")
-        download_file(
-            "http://www.robots.ox.ac.uk/~vgg/data/fgvc-aircraft/archives/fgvc-aircraft-2013b.tar.gz",
-            file_name,
-        )
-        print("\nDownloading done.\n")
+        # 直接流式解包HTTP响应：解压与网络IO重叠，不写中间tar包
+        print(f"Downloading and untarring {untar_file_name}\n")
+        try:
+            with session.get(url, stream=True) as r:
+                r.raw.decode_content = False
+                if shutil.which("tar"):
+                    # 原生tar在C里完成inflate+写盘，比Python的tarfile快数倍
+                    os.makedirs(partial_name, exist_ok=True)
+                    proc = subprocess.Popen(
+                        ["tar", "-xzf", "-", "-C", partial_name],
+                        stdin=subprocess.PIPE,
+                    )
+                    for chunk in r.iter_content(chunk_size=1024 * 1024):
+                        proc.stdin.write(chunk)
+                    proc.stdin.close()
+                    if proc.wait() != 0:
+                        raise tarfile.TarError("native tar exited with nonzero status")
+                else:
+                    with tarfile.open(fileobj=r.raw, mode="r|gz") as tar:
+                        tar.extractall(partial_name)
+            os.rename(partial_name, untar_file_name)
+            print("Downloading done.\n")
+            return
+        except (requests.RequestException, tarfile.TarError, OSError):
+            # 流式解包中断时清掉残缺目录，退回到文件方式（可断点重下）
+            shutil.rmtree(partial_name, ignore_errors=True)
+            print(f"Streaming untar failed, downloading {file_name}\n")
+            parallel_download(url, file_name)
+            print("\nDownloading done.\n")
     else:
         print(
             "fgvc-aircraft-2013b.tar.gz has already been downloaded. Did not download twice.\n"
         )
 
-    untar_file_name = os.path.join(dir_path, "aircraft")
-    if not os.path.exists(untar_file_name):
-        tarname = file_name
-        print("Untarring: {}".format(tarname))
-        tar = tarfile.open(tarname)
-        tar.extractall(untar_file_name)
-        tar.close()
-    else:
-        print(f"{untar_file_name} folder already exists. Did not untarring twice\n")
+    print("Untarring: {}".format(file_name))
+    # 显式使用非流式的r:gz模式，避免自动探测走_Stream的逐块切片路径
+    tar = tarfile.open(file_name, mode="r:gz")
+    tar.extractall(partial_name)
+    tar.close()
+    os.rename(partial_name, untar_file_name)
     os.remove(file_name)
 
 
@@ -0,0 +1,52 @@
+import numpy as np
+from numba import njit, prange
+
+
+@njit(parallel=True, fastmath=True, cache=True)
+def estimate_kernel(x_t, x, fitness, alpha):
+    """CPU kernel equivalent to BayesianEstimator.estimate for the uniform density.
+
+    Fuses the squared distances, the log-space softmax and the weighted sum into
+    one pass per query row, so no (n_q, n_s) intermediate ever hits main memory.
+
+    Args:
+    - x_t: np.ndarray, shape (n_q, d), the query samples.
+    - x: np.ndarray, shape (n_s, d), the stored samples.
+    - fitness: np.ndarray, shape (n_s,), the fitness values.
+    - alpha: float, the diffusion schedule value for this step.
+
+    Returns:
+    - origin: np.ndarray, shape (n_q, d), the estimated origin points.
+    """
+    n_q = x_t.shape[0]
+    n_s = x.shape[0]
+    d = x.shape[1]
+    sqrt_alpha = alpha**0.5
+    inv_two_sigma2 = 1.0 / (2.0 * (1.0 - alpha))
+    logf = np.log(fitness + 1e-9)
+    origin = np.empty((n_q, d), dtype=x.dtype)
+    # query rows are independent, prange spreads them over all cores
+    for i in prange(n_q):
+        logits = np.empty(n_s, dtype=np.float64)
+        m = -np.inf
+        for j in range(n_s):
+            dist2 = 0.0
+            for k in range(d):
+                diff = x_t[i, k] - sqrt_alpha * x[j, k]
+                dist2 += diff * diff
+            l = -dist2 * inv_two_sigma2 + logf[j]
+            logits[j] = l
+            if l > m:
+                m = l
+        # subtract the row max before exp to avoid overflow
+        s = 0.0
+        for j in range(n_s):
+            w = np.exp(logits[j] - m)
+            logits[j] = w
+            s += w
+        for k in range(d):
+            acc = 0.0
+            for j in range(n_s):
+                acc += logits[j] * x[j, k]
+            origin[i, k] = acc / s
+    return origin
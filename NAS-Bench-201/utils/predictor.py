@@ -1,26 +1,69 @@
 import torch
 from utils.corrector import normalize
 
-def ddim_step(xt, x0, alphas: tuple, noise: float = None):
+try:
+    from utils.predictor_numba import estimate_kernel as _numba_estimate_kernel
+except ImportError:
+    # numba是可选依赖，未安装时自动回退到纯torch实现
+    _numba_estimate_kernel = None
+
+def ddim_affine(consts: tuple, noise: float = None):
+    """Collapse one DDIM step into affine coefficients (a, b, sigma).
+
+    The update x_next = sqrt(alpha_{t-1})*x0 + sqrt(1-alpha_{t-1}-sigma^2)*eps
+    + sigma*z is an affine combination a*x0 + b*xt + sigma*z once eps is
+    substituted, so a and b are constant per step.
+    """
+    sqrt_alphat, sqrt_alphatp, sqrt_one_minus_alphat, base_sigma = consts
+    # 计算噪声强度sigma
+    sigma = base_sigma if noise is None else base_sigma * noise
+    # 将eps项折叠进标量系数：x_next = a*x0 + b*xt + sigma*noise
+    b = ((1 - sqrt_alphatp ** 2 - sigma ** 2) ** 0.5) / sqrt_one_minus_alphat
+    a = sqrt_alphatp - sqrt_alphat * b
+    return a, b, sigma
+
+
+def ddim_step(xt, x0, consts: tuple, noise: float = None, noise_buf: torch.Tensor = None, out: torch.Tensor = None, affine: tuple = None):
     """One step of the DDIM algorithm.
 
     Args:
     - xt: torch.Tensor, shape (n, d), the current samples.
     - x0: torch.Tensor, shape (n, d), the estimated origin.
-    - alphas: tuple of two floats, alpha_{t} and alpha_{t-1}.
+    - consts: tuple of four floats, sqrt(alpha_t), sqrt(alpha_{t-1}),
+      sqrt(1 - alpha_t) and the default DDPM sigma, precomputed once per step.
+    - noise_buf: optional preallocated (n, d) buffer reused for the Gaussian noise.
+    - out: optional preallocated (n, d) buffer the result is written into.
+    - affine: optional (a, b, sigma) from ddim_affine, computed here otherwise.
 
     Returns:
     - x_next: torch.Tensor, shape (n, d), the next samples.
     """
-    alphat, alphatp = alphas
-    # 计算噪声强度sigma
-    sigma = ddpm_sigma(alphat, alphatp) * noise
-    # 执行一步DDIM的反向去噪迭代
-    eps = (xt - (alphat ** 0.5) * x0) / (1.0 - alphat) ** 0.5
-    if sigma is None:
-        sigma = ddpm_sigma(alphat, alphatp)
-    x_next = (alphatp ** 0.5) * x0 + ((1 - alphatp - sigma ** 2) ** 0.5) * eps + sigma * torch.randn_like(x0)
-    return x_next
+    if affine is None:
+        affine = ddim_affine(consts, noise)
+    a, b, sigma = affine
+    # 采样高斯噪声时复用预分配的缓冲区，避免每步重新分配
+    if noise_buf is None:
+        noise_buf = torch.randn_like(x0)
+    else:
+        torch.randn(noise_buf.shape, out=noise_buf)
+    # 写入预分配的输出缓冲区并原位累加
+    if out is None:
+        out = torch.empty_like(x0)
+    # 标量以0维张量传入：Dynamo会对Python浮点数特化，alpha每步都在变，
+    # 传浮点数会导致每步重编译直到触发重编译上限后永久退回eager
+    a = torch.as_tensor(a, dtype=x0.dtype, device=x0.device)
+    b = torch.as_tensor(b, dtype=x0.dtype, device=x0.device)
+    sigma = torch.as_tensor(sigma, dtype=x0.dtype, device=x0.device)
+    return _ddim_step_core(xt, x0, noise_buf, out, a, b, sigma)
+
+
+@torch.compile(fullgraph=True, dynamic=False)
+def _ddim_step_core(xt, x0, noise_buf, out, a, b, sigma):
+    # 三个原位元素级操作，由torch.compile融合为单个kernel，每个张量只读写一次
+    torch.mul(x0, a, out=out)
+    out.addcmul_(xt, b)
+    out.addcmul_(noise_buf, sigma)
+    return out
 
 
 def ddpm_sigma(alphat, alphatp):
@@ -31,52 +74,83 @@ def ddpm_sigma(alphat, alphatp):
 class BayesianEstimator:
     """Bayesian Estimator of the origin points, based on current samples and fitness values."""
     def __init__(self, x: torch.tensor, fitness: torch.tensor, alpha, density='uniform', h=0.1):
-        self.x = x
-        self.fitness = fitness
+        # 样本和适应度存放在按容量增长的缓冲区中，append按摊销O(1)扩容
+        self._x_buf = x
+        self._fitness_buf = fitness
+        self._len = x.shape[0]
+        self._cap = x.shape[0]
         self.alpha = alpha
+        # 预先计算alpha的派生常量，避免在热路径上重复计算
+        self._sqrt_alpha = float(alpha) ** 0.5
+        self._two_sigma2 = 2.0 * (1.0 - float(alpha))
+        # GPU上用bf16计算概率核（softmax会归一化，容忍低精度），内存流量减半；CPU保持FP32
+        self.dtype = torch.bfloat16 if x.is_cuda else x.dtype
         self.density_method = density
         self.h = h
         if not density in ['uniform']:
             raise NotImplementedError(f'Density estimator {density} is not implemented.')
+        self._refresh_cache()
+
+    @property
+    def x(self):
+        return self._x_buf[:self._len]
+
+    @property
+    def fitness(self):
+        return self._fitness_buf[:self._len]
+
+    def _refresh_cache(self):
+        # 样本和alpha在一步内固定，mu、mu的平方范数和log适应度只需在样本变化时重建
+        self._mu = (self.x * self._sqrt_alpha).to(self.dtype)
+        self._mu_sq = (self._mu * self._mu).sum(-1)
+        self._logfitness = torch.log(self.fitness + 1e-9).to(self.dtype)
 
     def append(self, estimator):
-        # 将另一个估计器的样本数据和适应度值拼接到当前估计器中
-        self.x = torch.cat([self.x, estimator.x], dim=0)
-        self.fitness = torch.cat([self.fitness, estimator.fitness], dim=0)
-    
+        # 将另一个估计器的样本数据和适应度值拼接到当前估计器中（容量翻倍，避免每次整体重新分配）
+        n_new = estimator.x.shape[0]
+        need = self._len + n_new
+        if need > self._cap:
+            new_cap = max(2 * self._cap, need)
+            x_buf = torch.empty(new_cap, *self._x_buf.shape[1:], dtype=self._x_buf.dtype, device=self._x_buf.device)
+            x_buf[:self._len].copy_(self._x_buf[:self._len])
+            fitness_buf = torch.empty(new_cap, *self._fitness_buf.shape[1:], dtype=self._fitness_buf.dtype, device=self._fitness_buf.device)
+            fitness_buf[:self._len].copy_(self._fitness_buf[:self._len])
+            self._x_buf, self._fitness_buf, self._cap = x_buf, fitness_buf, new_cap
+        self._x_buf[self._len:need].copy_(estimator.x)
+        self._fitness_buf[self._len:need].copy_(estimator.fitness)
+        self._len = need
+        # 样本集变了，缓存的派生张量随之失效
+        self._refresh_cache()
+
     def density(self, x):
         # 根据不同的概率分布，计算概率密度值
         if self.density_method == 'uniform':
             return torch.ones(x.shape[0]) / x.shape[0]
     
-    @staticmethod
-    def norm(x):
-        # 计算向量的范数
-        if x.shape[-1] == 1:
-            # for some reason, torch.norm become very slow when dim=1, so we use torch.abs instead
-            return torch.abs(x).squeeze(-1)
-        else:
-            return torch.norm(x, dim=-1)
-
-    def gaussian_prob(self, x, mu, sigma):
-        # 计算高斯分布的概率密度值
-        dist = self.norm(x - mu)
-        return torch.exp(-(dist ** 2) / (2 * sigma ** 2))
-
-    def _estimate(self, x_t, p_x_t):
-        # diffusion proability, P = N(x_t; \sqrt{α_t}x,\sqrt{1-α_t})
-        mu = self.x * (self.alpha ** 0.5)   # 均值
-        sigma = (1 - self.alpha) ** 0.5     # 标准差
-        p_diffusion = self.gaussian_prob(x_t, mu, sigma)
-        # 通过概率和适应度值估计原始样本（+1e-9是为了防止为0出错）
-        prob = (self.fitness + 1e-9) * (p_diffusion + 1e-9) / (p_x_t + 1e-9)
-        z = torch.sum(prob)
-        origin = torch.sum(prob.unsqueeze(1) * self.x, dim=0) / (z + 1e-9)
-        return origin
-
     def estimate(self, x_t):
-        p_x_t = self.density(x_t)   # 计算概率密度值
-        origin = torch.vmap(self._estimate, (0, 0))(x_t, p_x_t) #进行向量化
+        # CPU上走numba并行kernel：距离、softmax、加权求和逐行融合，不生成(n_q, n_s)中间矩阵
+        if (_numba_estimate_kernel is not None and x_t.device.type == 'cpu'
+                and self.density_method == 'uniform'):
+            origin = _numba_estimate_kernel(
+                x_t.detach().numpy(), self.x.detach().numpy(),
+                self.fitness.detach().numpy(), float(self.alpha))
+            return torch.from_numpy(origin)
+        # diffusion proability, P = N(x_t; \sqrt{α_t}x,\sqrt{1-α_t})
+        # mu、mu_sq和log适应度都来自缓存，每次estimate不再重算
+        mu = self._mu   # 均值
+        xq = x_t.to(self.dtype)
+        # ||a-b||² = ||a||² + ||b||² - 2a·b：一次GEMM代替(Nq, Ns, D)的广播减法，任意维度都适用
+        xq_sq = (xq * xq).sum(-1, keepdim=True)
+        dist2 = xq_sq + self._mu_sq.unsqueeze(0) - 2.0 * (xq @ mu.transpose(0, 1))
+        # 在对数空间中计算权重并用softmax归一化，避免exp下溢（+1e-9是为了防止log(0)出错）
+        logits = -dist2 / self._two_sigma2 + self._logfitness
+        if self.density_method != 'uniform':
+            # 均匀密度对每行是常数，会被softmax消去，只有非均匀密度才需要计算
+            p_x_t = self.density(x_t)
+            logits = logits - torch.log(p_x_t + 1e-9).to(self.dtype).unsqueeze(1)
+        # softmax和加权求和回到FP32，保证累加精度
+        prob = torch.softmax(logits.float(), dim=1)
+        origin = prob @ self.x
         return origin
 
     def __call__(self, x_t):
@@ -94,12 +168,31 @@ class BayesianGenerator:
         self.elite_strategy = elite_strategy
         self.alpha, self.alpha_past = alpha
         self.estimator = BayesianEstimator(self.x, self.fitness, self.alpha, density=density, h=h)
-    
+        # 预先计算一步DDIM所需的常量，每个时间步只计算一次
+        self._ddim_consts = (
+            float(self.alpha) ** 0.5,
+            float(self.alpha_past) ** 0.5,
+            (1.0 - float(self.alpha)) ** 0.5,
+            ddpm_sigma(float(self.alpha), float(self.alpha_past)),
+        )
+        self._noise_buf = None
+        self._out_buf = None
+        self._affine = None
+        self._affine_noise = None
+
     def generate(self, x, noise, elite_rate, return_x0=False):
         # 通过当前时间步的样本和适应度值，估计初始点的样本
         x0_est = self.estimator(x)
+        # 噪声和输出缓冲区在首次调用时按样本形状惰性分配
+        if self._noise_buf is None or self._noise_buf.shape != x.shape:
+            self._noise_buf = torch.empty_like(x)
+            self._out_buf = torch.empty_like(x)
+        # 仿射系数(a, b, sigma)在同一噪声强度下每步只计算一次
+        if self._affine is None or self._affine_noise != noise:
+            self._affine = ddim_affine(self._ddim_consts, noise)
+            self._affine_noise = noise
         # 执行一次DDIM的反向去噪迭代
-        x_next = ddim_step(xt=x, x0=x0_est, alphas=(self.alpha, self.alpha_past), noise=noise)
+        x_next = ddim_step(xt=x, x0=x0_est, consts=self._ddim_consts, noise_buf=self._noise_buf, out=self._out_buf, affine=self._affine)
         # 正则化
         x_next = normalize(x_next)
         if return_x0:
@@ -1,31 +1,80 @@
 import torch
 from utils.corrector import normalize
 
+try:
+    from utils.predictor_numba import estimate_kernel as _numba_estimate_kernel
+except ImportError:
+    # numba is optional; fall back to the pure torch implementation
+    _numba_estimate_kernel = None
 
-def ddim_step(xt, x0, alphas: tuple, noise: float = None):
+
+def ddim_affine(consts: tuple, noise: float = None):
+    """Collapse one DDIM step into affine coefficients (a, b, sigma).
+
+    The update x_next = sqrt(alpha_{t-1})*x0 + sqrt(1-alpha_{t-1}-sigma^2)*eps
+    + sigma*z is an affine combination a*x0 + b*xt + sigma*z once eps is
+    substituted, so a and b are constant per step.
+    """
+    sqrt_alphat, sqrt_alphatp, sqrt_one_minus_alphat, base_sigma = consts
+    # sigma
+    sigma = base_sigma if noise is None else base_sigma * noise
+    # fold the eps term into scalar coefficients: x_next = a*x0 + b*xt + sigma*noise
+    b = ((1 - sqrt_alphatp**2 - sigma**2) ** 0.5) / sqrt_one_minus_alphat
+    a = sqrt_alphatp - sqrt_alphat * b
+    return a, b, sigma
+
+
+def ddim_step(
+    xt,
+    x0,
+    consts: tuple,
+    noise: float = None,
+    noise_buf: torch.Tensor = None,
+    out: torch.Tensor = None,
+    affine: tuple = None,
+):
     """One step of the DDIM algorithm.
 
     Args:
     - xt: torch.Tensor, shape (n, d), the current samples.
     - x0: torch.Tensor, shape (n, d), the estimated origin.
-    - alphas: tuple of two floats, alpha_{t} and alpha_{t-1}.
+    - consts: tuple of four floats, sqrt(alpha_t), sqrt(alpha_{t-1}),
+      sqrt(1 - alpha_t) and the default DDPM sigma, precomputed once per step.
+    - noise_buf: optional preallocated (n, d) buffer reused for the Gaussian noise.
+    - out: optional preallocated (n, d) buffer the result is written into.
+    - affine: optional (a, b, sigma) from ddim_affine, computed here otherwise.
 
     Returns:
     - x_next: torch.Tensor, shape (n, d), the next samples.
     """
-    alphat, alphatp = alphas
-    # sigma
-    sigma = ddpm_sigma(alphat, alphatp) * noise
-    # DDIM
-    eps = (xt - (alphat**0.5) * x0) / (1.0 - alphat) ** 0.5
-    if sigma is None:
-        sigma = ddpm_sigma(alphat, alphatp)
-    x_next = (
-        (alphatp**0.5) * x0
-        + ((1 - alphatp - sigma**2) ** 0.5) * eps
-        + sigma * torch.randn_like(x0)
-    )
-    return x_next
+    if affine is None:
+        affine = ddim_affine(consts, noise)
+    a, b, sigma = affine
+    # reuse the preallocated noise buffer instead of allocating each step
+    if noise_buf is None:
+        noise_buf = torch.randn_like(x0)
+    else:
+        torch.randn(noise_buf.shape, out=noise_buf)
+    # write into the preallocated output buffer, accumulating in place
+    if out is None:
+        out = torch.empty_like(x0)
+    # pass the scalars as 0-d tensors: Dynamo specializes Python floats, and
+    # alpha changes every step, so floats would recompile per step until the
+    # recompile limit is hit and the kernel silently falls back to eager
+    a = torch.as_tensor(a, dtype=x0.dtype, device=x0.device)
+    b = torch.as_tensor(b, dtype=x0.dtype, device=x0.device)
+    sigma = torch.as_tensor(sigma, dtype=x0.dtype, device=x0.device)
+    return _ddim_step_core(xt, x0, noise_buf, out, a, b, sigma)
+
+
+@torch.compile(fullgraph=True, dynamic=False)
+def _ddim_step_core(xt, x0, noise_buf, out, a, b, sigma):
+    # three in-place elementwise ops, fused into one kernel by torch.compile,
+    # so every tensor is read and written exactly once
+    torch.mul(x0, a, out=out)
+    out.addcmul_(xt, b)
+    out.addcmul_(noise_buf, sigma)
+    return out
 
 
 def ddpm_sigma(alphat, alphatp):
@@ -39,54 +88,103 @@ class BayesianEstimator:
     def __init__(
         self, x: torch.tensor, fitness: torch.tensor, alpha, density="uniform", h=0.1
     ):
-        self.x = x
-        self.fitness = fitness
+        # samples and fitness live in capacity-doubling buffers; append is amortized O(1)
+        self._x_buf = x
+        self._fitness_buf = fitness
+        self._len = x.shape[0]
+        self._cap = x.shape[0]
         self.alpha = alpha
+        # alpha-derived constants, computed once instead of per estimate call
+        self._sqrt_alpha = float(alpha) ** 0.5
+        self._two_sigma2 = 2.0 * (1.0 - float(alpha))
+        # bf16 probability kernel on GPU (softmax normalizes anyway); FP32 on CPU
+        self.dtype = torch.bfloat16 if x.is_cuda else x.dtype
         self.density_method = density
         self.h = h
         if not density in ["uniform"]:
             raise NotImplementedError(
                 f"Density estimator {density} is not implemented."
             )
+        self._refresh_cache()
+
+    @property
+    def x(self):
+        return self._x_buf[: self._len]
+
+    @property
+    def fitness(self):
+        return self._fitness_buf[: self._len]
+
+    def _refresh_cache(self):
+        # samples and alpha are fixed within a step, so mu, its squared
+        # norms and the log fitness only need rebuilding when samples change
+        self._mu = (self.x * self._sqrt_alpha).to(self.dtype)
+        self._mu_sq = (self._mu * self._mu).sum(-1)
+        self._logfitness = torch.log(self.fitness + 1e-9).to(self.dtype)
 
     def append(self, estimator):
         #
-        self.x = torch.cat([self.x, estimator.x], dim=0)
-        self.fitness = torch.cat([self.fitness, estimator.fitness], dim=0)
+        n_new = estimator.x.shape[0]
+        need = self._len + n_new
+        if need > self._cap:
+            new_cap = max(2 * self._cap, need)
+            x_buf = torch.empty(
+                new_cap,
+                *self._x_buf.shape[1:],
+                dtype=self._x_buf.dtype,
+                device=self._x_buf.device,
+            )
+            x_buf[: self._len].copy_(self._x_buf[: self._len])
+            fitness_buf = torch.empty(
+                new_cap,
+                *self._fitness_buf.shape[1:],
+                dtype=self._fitness_buf.dtype,
+                device=self._fitness_buf.device,
+            )
+            fitness_buf[: self._len].copy_(self._fitness_buf[: self._len])
+            self._x_buf, self._fitness_buf, self._cap = x_buf, fitness_buf, new_cap
+        self._x_buf[self._len : need].copy_(estimator.x)
+        self._fitness_buf[self._len : need].copy_(estimator.fitness)
+        self._len = need
+        # the sample set changed, the cached derived tensors are stale
+        self._refresh_cache()
 
     def density(self, x):
         # ，
         if self.density_method == "uniform":
             return torch.ones(x.shape[0]) / x.shape[0]
 
-    @staticmethod
-    def norm(x):
-        #
-        if x.shape[-1] == 1:
-            # for some reason, torch.norm become very slow when dim=1, so we use torch.abs instead
-            return torch.abs(x).squeeze(-1)
-        else:
-            return torch.norm(x, dim=-1)
-
-    def gaussian_prob(self, x, mu, sigma):
-        #
-        dist = self.norm(x - mu)
-        return torch.exp(-(dist**2) / (2 * sigma**2))
-
-    def _estimate(self, x_t, p_x_t):
-        # diffusion proability, P = N(x_t; \sqrt{α_t}x,\sqrt{1-α_t})
-        mu = self.x * (self.alpha**0.5)  #
-        sigma = (1 - self.alpha) ** 0.5  #
-        p_diffusion = self.gaussian_prob(x_t, mu, sigma)
-        # （+1e-90）
-        prob = (self.fitness + 1e-9) * (p_diffusion + 1e-9) / (p_x_t + 1e-9)
-        z = torch.sum(prob)
-        origin = torch.sum(prob.unsqueeze(1) * self.x, dim=0) / (z + 1e-9)
-        return origin
-
     def estimate(self, x_t):
-        p_x_t = self.density(x_t)  #
-        origin = torch.vmap(self._estimate, (0, 0))(x_t, p_x_t)  #
+        # on CPU the numba kernel fuses distances, softmax and the weighted
+        # sum per query row, never materializing the (n_q, n_s) matrix
+        if (
+            _numba_estimate_kernel is not None
+            and x_t.device.type == "cpu"
+            and self.density_method == "uniform"
+        ):
+            origin = _numba_estimate_kernel(
+                x_t.detach().numpy(),
+                self.x.detach().numpy(),
+                self.fitness.detach().numpy(),
+                float(self.alpha),
+            )
+            return torch.from_numpy(origin)
+        # diffusion proability, P = N(x_t; \sqrt{α_t}x,\sqrt{1-α_t})
+        # mu, mu_sq and the log fitness come from the cache
+        mu = self._mu
+        xq = x_t.to(self.dtype)
+        # ||a-b||² = ||a||² + ||b||² - 2a·b: one GEMM instead of the (Nq, Ns, D) broadcast
+        xq_sq = (xq * xq).sum(-1, keepdim=True)
+        dist2 = xq_sq + self._mu_sq.unsqueeze(0) - 2.0 * (xq @ mu.transpose(0, 1))
+        # log-space weights, softmax normalizes, no exp underflow
+        logits = -dist2 / self._two_sigma2 + self._logfitness
+        if self.density_method != "uniform":
+            # a uniform density is constant per row and cancels in the softmax
+            p_x_t = self.density(x_t)
+            logits = logits - torch.log(p_x_t + 1e-9).to(self.dtype).unsqueeze(1)
+        # back to FP32 for the softmax and weighted sum
+        prob = torch.softmax(logits.float(), dim=1)
+        origin = prob @ self.x
         return origin
 
     def __call__(self, x_t):
@@ -109,13 +207,38 @@ class BayesianGenerator:
         self.estimator = BayesianEstimator(
             self.x, self.fitness, self.alpha, density=density, h=h
         )
+        # DDIM step constants, computed once per step
+        self._ddim_consts = (
+            float(self.alpha) ** 0.5,
+            float(self.alpha_past) ** 0.5,
+            (1.0 - float(self.alpha)) ** 0.5,
+            ddpm_sigma(float(self.alpha), float(self.alpha_past)),
+        )
+        self._noise_buf = None
+        self._out_buf = None
+        self._affine = None
+        self._affine_noise = None
 
     def generate(self, x, noise, elite_rate, return_x0=False):
         # ，
         x0_est = self.estimator(x)
+        # lazily allocate the noise and output buffers at the sample shape
+        if self._noise_buf is None or self._noise_buf.shape != x.shape:
+            self._noise_buf = torch.empty_like(x)
+            self._out_buf = torch.empty_like(x)
+        # the affine coefficients (a, b, sigma) are constant per step for a
+        # fixed noise strength, so compute them once
+        if self._affine is None or self._affine_noise != noise:
+            self._affine = ddim_affine(self._ddim_consts, noise)
+            self._affine_noise = noise
         # DDIM
         x_next = ddim_step(
-            xt=x, x0=x0_est, alphas=(self.alpha, self.alpha_past), noise=noise
+            xt=x,
+            x0=x0_est,
+            consts=self._ddim_consts,
+            noise_buf=self._noise_buf,
+            out=self._out_buf,
+            affine=self._affine,
         )
         #
         x_next = normalize(x_next)
@@ -4,16 +4,16 @@ import math
 import json
 import scipy
 import random
+import warnings
+import functools
 import numpy as np
 import PIL
 from PIL import Image
 import collections
 import torch
-import transforms3d
 import itertools
 import torchvision
 import torchvision.transforms as T
-from skimage import io, transform
 from torchvision.transforms import functional as F
 
 if sys.version_info < (3, 3):
@@ -29,6 +29,13 @@ if str(lib_dir) not in sys.path:
     sys.path.insert(0, str(lib_dir))
 from data.synset import synset as raw_synset
 
+# Per-sample resize is the dominant CPU cost in data loading. Pillow-SIMD is a
+# drop-in replacement whose SSE4/AVX2 resampling kernels are several times
+# faster for the same API; its versions carry a '.postN' suffix.
+if '.post' not in getattr(PIL, '__version__', ''):
+    warnings.warn(f'Pillow-SIMD not detected (PIL {getattr(PIL, "__version__", "unknown")}); '
+                  f'install pillow-simd for faster image resampling in data loading.')
+
 
 ##############
 # Helper fns #
@@ -40,6 +47,20 @@ def read_json(file_path):
     return data
 
 
+def open_image_for_resize(path, target_hw):
+    """
+    Open an image that will subsequently be downscaled to target_hw.
+    For JPEG sources, .draft() lets libjpeg decode at 1/2, 1/4 or 1/8 scale
+    during entropy decode, skipping the DCT work a later resize would throw
+    away; other formats ignore the hint. Drafting to 2x the target leaves
+    enough resolution for a clean bilinear final step.
+    """
+    image = Image.open(path)
+    image.draft('RGB', (target_hw[0] * 2, target_hw[1] * 2))
+    image.load()
+    return image
+
+
 #######################
 # Image transform fns #
 #######################
@@ -67,10 +88,17 @@ class Compose(T.Compose):
         self.transforms = transforms
         self.task_name = task_name
         assert task_name in TASK_NAMES
+        # task_name is fixed for the lifetime of the pipeline, so resolve each
+        # transform's task branch once here; __call__ then runs straight
+        # through the specialized closures with no per-sample dispatch
+        self._compiled = [
+            t._build_for_task(task_name) if hasattr(t, '_build_for_task')
+            else functools.partial(t, task_name=task_name)
+            for t in transforms]
 
     def __call__(self, sample):
-        for t in self.transforms:
-            sample = t(sample, self.task_name)
+        for fn in self._compiled:
+            sample = fn(sample)
         return sample
 
 
@@ -81,19 +109,17 @@ class Cutout(object):
 
     def cutout(self, img):
         h, w = img.size(1), img.size(2)
-        mask = np.ones((h, w), np.float32)
-        y = np.random.randint(h)
-        x = np.random.randint(w)
-
-        y1 = np.clip(y - self.length // 2, 0, h)
-        y2 = np.clip(y + self.length // 2, 0, h)
-        x1 = np.clip(x - self.length // 2, 0, w)
-        x2 = np.clip(x + self.length // 2, 0, w)
-
-        mask[y1: y2, x1: x2] = 0.
-        mask = torch.from_numpy(mask)
-        mask = mask.expand_as(img)
-        img *= mask
+        y = torch.randint(h, size=(1,)).item()
+        x = torch.randint(w, size=(1,)).item()
+
+        y1 = max(y - self.length // 2, 0)
+        y2 = min(y + self.length // 2, h)
+        x1 = max(x - self.length // 2, 0)
+        x2 = min(x + self.length // 2, w)
+
+        # zero the rectangle in place instead of building an HxW mask and
+        # multiplying the whole image by it
+        img[:, y1:y2, x1:x2].zero_()
         return img
 
     def __repr__(self):
@@ -107,10 +133,18 @@ class Cutout(object):
         else:
             raise ValueError(f'task name {task_name} not available!')
 
+    def _build_for_task(self, task_name):
+        if task_name in ['class_object', 'class_scene', 'room_layout']:
+            return lambda sample: {'image': self.cutout(sample['image']),
+                                   'label': sample['label']}
+        return functools.partial(self.__call__, task_name=task_name)
+
 
 class Resize(T.Resize):
 
     def __init__(self, input_size, target_size=None, interpolation=Image.BILINEAR):
+        # BILINEAR (and NEAREST for segmentation labels) dispatch to SIMD
+        # convolution kernels when Pillow-SIMD is installed, see module check
         assert isinstance(input_size, int) or (isinstance(input_size, Iterable) and len(input_size) == 2)
         if target_size:
             assert isinstance(target_size, int) or (isinstance(target_size, Iterable) and len(target_size) == 2)
@@ -140,6 +174,18 @@ class Resize(T.Resize):
         else:
             raise ValueError(f'task name {task_name} not available!')
 
+    def _build_for_task(self, task_name):
+        if task_name in ["autoencoder", "normal"]:
+            return lambda sample: {'image': F.resize(sample['image'], self.input_size, self.interpolation),
+                                   'label': F.resize(sample['label'], self.target_size, self.interpolation)}
+        if task_name == "segmentsemantic":
+            return lambda sample: {'image': F.resize(sample['image'], self.input_size, self.interpolation),
+                                   'label': F.resize(sample['label'], self.target_size, Image.NEAREST)}
+        if task_name in ['class_object', 'class_scene', 'room_layout', "jigsaw"]:
+            return lambda sample: {'image': F.resize(sample['image'], self.input_size, self.interpolation),
+                                   'label': sample['label']}
+        return functools.partial(self.__call__, task_name=task_name)
+
     def __repr__(self):
         interpolate_str = _pil_interpolation_to_str[self.interpolation]
         return self.__class__.__name__ + '(input_size={0}, target_size={1}, interpolation={2})'.format(
@@ -173,6 +219,15 @@ class ToPILImage(T.ToPILImage):
         else:
             raise ValueError(f'task name {task_name} not available!')
 
+    def _build_for_task(self, task_name):
+        if task_name in ["autoencoder", "normal", 'segmentsemantic']:
+            return lambda sample: {'image': F.to_pil_image(sample['image'], self.mode),
+                                   'label': F.to_pil_image(sample['label'], self.mode)}
+        if task_name in ['class_object', 'class_scene', 'room_layout', "jigsaw"]:
+            return lambda sample: {'image': F.to_pil_image(sample['image'], self.mode),
+                                   'label': sample['label']}
+        return functools.partial(self.__call__, task_name=task_name)
+
 
 class ToTensor(T.ToTensor):
 
@@ -209,6 +264,27 @@ class ToTensor(T.ToTensor):
             image += min_val
         return {'image': image, 'label': label}
 
+    def _build_for_task(self, task_name):
+        new_scale = self.new_scale
+
+        def rescale(tensor):
+            if new_scale:
+                min_val, max_val = new_scale
+                tensor *= (max_val - min_val)
+                tensor += min_val
+            return tensor
+
+        if task_name in ["autoencoder", "normal"]:
+            return lambda sample: {'image': rescale(F.to_tensor(sample['image']).float()),
+                                   'label': rescale(F.to_tensor(sample['label']).float())}
+        if task_name == 'segmentsemantic':
+            return lambda sample: {'image': rescale(F.to_tensor(sample['image']).float()),
+                                   'label': torch.tensor(np.array(sample['label']), dtype=torch.uint8)}
+        if task_name in ['class_object', 'class_scene', 'room_layout']:
+            return lambda sample: {'image': rescale(F.to_tensor(sample['image']).float()),
+                                   'label': torch.FloatTensor(sample['label'])}
+        return functools.partial(self.__call__, task_name=task_name)
+
 
 class Normalize(T.Normalize):
 
@@ -240,9 +316,29 @@ class Normalize(T.Normalize):
         else:
             raise ValueError(f'task name {task_name} not available!')
 
+    def _build_for_task(self, task_name):
+        if task_name in ["autoencoder"]:
+            return lambda sample: {'image': F.normalize(sample['image'], self.mean, self.std, self.inplace),
+                                   'label': F.normalize(sample['label'], self.mean, self.std, self.inplace)}
+        if task_name in ["normal", 'segmentsemantic', 'class_object', 'class_scene', 'room_layout']:
+            return lambda sample: {'image': F.normalize(sample['image'], self.mean, self.std, self.inplace),
+                                   'label': sample['label']}
+        return functools.partial(self.__call__, task_name=task_name)
+
+
+def _hflip(img):
+    # tensors flip with one vectorized kernel on the last dim, skipping the
+    # torchvision dispatcher; PIL images keep the F.hflip path
+    if isinstance(img, torch.Tensor):
+        return img.flip(-1)
+    return F.hflip(img)
+
 
 class RandomHorizontalFlip(T.RandomHorizontalFlip):
-    """Horizontally flip the given PIL Image randomly with a given probability.
+    """Horizontally flip the given image randomly with a given probability.
+
+    Works on PIL images and, when placed after ToTensor, directly on CHW
+    tensors via the vectorized flip.
 
     Args:
         p (float): probability of the image being flipped. Default value is 0.5
@@ -263,10 +359,10 @@ class RandomHorizontalFlip(T.RandomHorizontalFlip):
         image, label = sample['image'], sample['label']
         if random_num < self.p:
             if task_name in ["autoencoder", 'segmentsemantic']:
-                return {'image': F.hflip(image),
-                        'label': F.hflip(label)}
+                return {'image': _hflip(image),
+                        'label': _hflip(label)}
             elif task_name in ['class_object', 'class_scene', "jigsaw"]:
-                return {'image': F.hflip(image),
+                return {'image': _hflip(image),
                         'label': label}
             elif task_name in ['normal', 'room_layout']:
                 raise ValueError(f'task name {task_name} not available!')
@@ -275,6 +371,23 @@ class RandomHorizontalFlip(T.RandomHorizontalFlip):
         else:
             return sample
 
+    def _build_for_task(self, task_name):
+        if task_name in ["autoencoder", 'segmentsemantic']:
+            def fn(sample):
+                if random.random() < self.p:
+                    return {'image': _hflip(sample['image']),
+                            'label': _hflip(sample['label'])}
+                return sample
+            return fn
+        if task_name in ['class_object', 'class_scene', "jigsaw"]:
+            def fn(sample):
+                if random.random() < self.p:
+                    return {'image': _hflip(sample['image']),
+                            'label': sample['label']}
+                return sample
+            return fn
+        return functools.partial(self.__call__, task_name=task_name)
+
 
 class RandomGrayscale(T.RandomGrayscale):
     """Randomly convert image to grayscale with a probability of p (default 0.1).
@@ -312,6 +425,18 @@ class RandomGrayscale(T.RandomGrayscale):
         else:
             return sample
 
+    def _build_for_task(self, task_name):
+        if task_name in ["jigsaw"]:
+            def fn(sample):
+                image = sample['image']
+                if random.random() < self.p:
+                    num_output_channels = 1 if image.mode == 'L' else 3
+                    return {'image': F.to_grayscale(image, num_output_channels=num_output_channels),
+                            'label': sample['label']}
+                return sample
+            return fn
+        return functools.partial(self.__call__, task_name=task_name)
+
 
 class ColorJitter(T.ColorJitter):
     def __init__(self, brightness=0, contrast=0, saturation=0, hue=0):
@@ -337,19 +462,128 @@ class ColorJitter(T.ColorJitter):
         else:
             raise ValueError(f'task name {task_name} not available!')
 
+    def _build_for_task(self, task_name):
+        if task_name in ['autoencoder']:
+            def fn(sample):
+                t = self.get_params(self.brightness, self.contrast,
+                                    self.saturation, self.hue)
+                return {'image': t(sample['image']), 'label': t(sample['label'])}
+            return fn
+        if task_name in ['segmentsemantic', 'class_object', 'class_scene', 'room_layout', 'normal', "jigsaw"]:
+            def fn(sample):
+                t = self.get_params(self.brightness, self.contrast,
+                                    self.saturation, self.hue)
+                return {'image': t(sample['image']), 'label': sample['label']}
+            return fn
+        return functools.partial(self.__call__, task_name=task_name)
+
+
+def build_v2_batch_transform(task_name, mean, std, input_size=None):
+    """
+    Opt-in torchvision.transforms.v2 pipeline for collated tensor batches.
+    The task-dispatching Compose above runs per sample on PIL images; for the
+    tasks whose labels are untouched by the image transforms (class_object,
+    class_scene, room_layout), the same image work can instead run once on a
+    collated uint8 (B, C, H, W) batch through the v2 fast paths --
+    v2.ToDtype(scale=True) fuses the uint8->float /255 conversion and
+    v2.Normalize is vectorized over the whole batch. Apply the returned
+    transform to the stacked batch after the DataLoader.
+    """
+    assert task_name in ['class_object', 'class_scene', 'room_layout'], \
+        f'v2 batch transform only covers image-only tasks, got {task_name}'
+    from torchvision.transforms import v2
+    ops = []
+    if input_size is not None:
+        ops.append(v2.Resize(input_size, antialias=True))
+    ops.append(v2.ToDtype(torch.float32, scale=True))
+    ops.append(v2.Normalize(mean, std))
+    return v2.Compose(ops)
+
+
+class BatchToFloatNormalize(object):
+    """Fused batch-level alternative to ToTensor + Normalize (+ Cutout).
+
+    The per-sample Compose chain runs the /255 scale, the normalization and
+    the cutout as three separate float passes inside the DataLoader workers.
+    When the dataset instead returns uint8 CHW tensors, apply this op once to
+    the collated (N, C, H, W) batch -- typically after
+    .to(device, non_blocking=True) -- and the whole chain becomes one
+    uint8 read and one float write: /255 and (x - mean)/std fold into a
+    single affine x*a + b, with the optional cutout zeroed in place.
+    """
+
+    def __init__(self, mean, std, cutout_length=None):
+        mean = torch.as_tensor(mean, dtype=torch.float32).view(1, -1, 1, 1)
+        std = torch.as_tensor(std, dtype=torch.float32).view(1, -1, 1, 1)
+        self.scale = 1.0 / (255.0 * std)
+        self.shift = -mean / std
+        self.cutout_length = int(cutout_length) if cutout_length else None
+
+    def __call__(self, batch):
+        # the folded 1/255 scale assumes uint8 input; on float input .to() is
+        # a no-op and the in-place ops would silently mutate the caller's batch
+        assert batch.dtype == torch.uint8, \
+            f'BatchToFloatNormalize expects a uint8 batch, got {batch.dtype}'
+        scale = self.scale.to(batch.device)
+        shift = self.shift.to(batch.device)
+        out = batch.to(torch.float32).mul_(scale).add_(shift)
+        if self.cutout_length:
+            n, _, h, w = out.shape
+            half = self.cutout_length // 2
+            ys = torch.randint(h, size=(n,))
+            xs = torch.randint(w, size=(n,))
+            for i in range(n):
+                y, x = int(ys[i]), int(xs[i])
+                out[i, :, max(y - half, 0): min(y + half, h),
+                    max(x - half, 0): min(x + half, w)].zero_()
+        return out
+
+    def __repr__(self):
+        return '{name}(cutout_length={cutout_length})'.format(name=self.__class__.__name__, **self.__dict__)
+
 
 ########################
 # Classification Tasks #
 ########################
 
 def np_softmax(logits):
-    maxs = np.amax(logits, axis=-1)
-    softmax = np.exp(logits - np.expand_dims(maxs, axis=-1))
-    sums = np.sum(softmax, axis=-1)
-    softmax = softmax / np.expand_dims(sums, -1)
+    # keepdims avoids the expand_dims round-trips and the in-place divide
+    # reuses the exp buffer, cutting the passes over logits roughly in half
+    maxs = np.amax(logits, axis=-1, keepdims=True)
+    softmax = np.exp(logits - maxs)
+    softmax /= np.sum(softmax, axis=-1, keepdims=True)
     return softmax
 
 
+@functools.lru_cache(maxsize=None)
+def _load_selection(task, final5k):
+    """
+    Load a class-selection mask once per worker process and cache it
+    :param task: task in ['class_object', 'class_scene']
+    :param final5k: transnas-bench data with reduced classes
+    :return: the selection mask as a bool np.array
+    """
+    lib_data_dir = os.path.abspath(os.path.dirname(__file__))
+    selection_file = os.path.join(lib_data_dir, f'{task}_final5k.npy') if final5k else \
+        os.path.join(lib_data_dir, f'{task}_selected.npy')
+    selection = np.load(selection_file).astype(bool)
+    # immutable; read-only pages stay copy-on-write-shared across fork workers
+    selection.flags.writeable = False
+    return selection
+
+
+@functools.lru_cache(maxsize=None)
+def _selection_index(task, final5k):
+    """
+    Non-zero positions of the selection mask as a small int array, so the
+    per-sample class reduction is one direct gather of the kept entries
+    instead of a scan over the full boolean mask
+    """
+    index = np.nonzero(_load_selection(task, final5k))[0].astype(np.int16)
+    index.flags.writeable = False
+    return index
+
+
 def load_class_object_logits(label_path, selected=False, normalize=True, final5k=False):
     """
     Class 1000 ImageNet Ground Truth
@@ -360,16 +594,14 @@ def load_class_object_logits(label_path, selected=False, normalize=True, final5k
     :return: target: the target probability (returned as np.array with dim=(1000/100/75,))
     """
     try:
-        logits = np.load(label_path)
+        # mmap: skip the full-buffer allocation, pages stream from page cache;
+        # the boolean selection below (or downstream argmax) copies compactly
+        logits = np.load(label_path, mmap_mode='r')
     except:
         print(f'corrupted: {label_path}!')
         raise
-    lib_data_dir = os.path.abspath(os.path.dirname(__file__))
     if selected:  # original taskonomy data: 1000 cls -> 100 cls
-        selection_file = os.path.join(lib_data_dir, 'class_object_final5k.npy') if final5k else \
-            os.path.join(lib_data_dir, 'class_object_selected.npy')
-        selection = np.load(selection_file)
-        logits = logits[selection.astype(bool)]
+        logits = logits[_selection_index('class_object', final5k)]
         if normalize:
             logits = logits / logits.sum()
     target = np.asarray(logits)
@@ -399,15 +631,11 @@ def load_class_scene_logits(label_path, selected=False, normalize=True, final5k=
     :return: target: the target probability (returned as np.array with dim=(365/63/47,))
     """
     try:
-        logits = np.load(label_path)
+        logits = np.load(label_path, mmap_mode='r')
     except:
         raise FileNotFoundError(f'corrupted: {label_path}!')
-    lib_data_dir = os.path.abspath(os.path.dirname(__file__))
     if selected:
-        selection_file = os.path.join(lib_data_dir, 'class_scene_final5k.npy') if final5k else \
-            os.path.join(lib_data_dir, 'class_scene_selected.npy')
-        selection = np.load(selection_file)
-        logits = logits[selection.astype(bool)]
+        logits = logits[_selection_index('class_scene', final5k)]
         if normalize:
             logits = logits / logits.sum()
     target = np.asarray(logits)
@@ -427,28 +655,27 @@ def load_class_scene_label(label_path, selected=False, final5k=False):
     return target
 
 
+@functools.lru_cache(maxsize=None)
 def get_synset(task, selected=True, final5k=False):
     """
-    Get class names for classification tasks
+    Get class names for classification tasks (parsed once per process and cached)
     :param task: task in ['class_object', 'class_scene']
     :param selected: original taskonomy data with reduced classes
     :param final5k: transnas-bench data with reduced classes
     :return:
     """
     if task == 'class_scene':
-        selection_file = 'class_scene_final5k.npy' if final5k else 'class_scene_selected.npy'
-        selection = np.load((Path(__file__).parent / selection_file).resolve())
+        selection = _load_selection('class_scene', final5k)
         with open((Path(__file__).parent / 'class_scene_names.json').resolve(), 'r') as fp:
             synset_scene = [x[3:] for x in json.load(fp)]
             if selected:
-                synset_scene = [x for x, y in zip(synset_scene, selection) if y == 1.]
+                synset_scene = [x for x, y in zip(synset_scene, selection) if y]
         synset = synset_scene
     elif task == 'class_object':
         synset_object = [" ".join(i.split(" ")[1:]) for i in raw_synset]
-        selection_file = 'class_object_final5k.npy' if final5k else 'class_object_selected.npy'
-        selection = np.load((Path(__file__).parent / selection_file).resolve())
+        selection = _load_selection('class_object', final5k)
         if selected:
-            synset_object = [x for x, y in zip(synset_object, selection) if y == 1.]
+            synset_object = [x for x, y in zip(synset_object, selection) if y]
         synset = synset_object
     else:
         raise ValueError(f"{task} not in ['class_object', 'class_scene'], cannot get_synset")
@@ -459,6 +686,47 @@ def get_synset(task, selected=True, final5k=False):
 # Room Layout (code from taskonomy) #
 #####################################
 
+# closed-form replacements for the transforms3d calls on this path;
+# transforms3d is pure python and dominated the per-label cost here
+
+_AXES_XYZ = np.eye(3)
+
+# the four 90-degree rotations about +z, written out exactly
+# (cos, sin) of k*pi/2 for k = 0..3
+_APPLY_90_DEG_ROT_K_TIMES = tuple(
+    np.array([[c, -s, 0.], [s, c, 0.], [0., 0., 1.]])
+    for c, s in ((1., 0.), (0., 1.), (-1., 0.), (0., -1.)))
+
+# min/max picks for the 8 corners of a bounding box, built once at import
+_CUBE_IDX = np.array(list(itertools.product((0, 1), repeat=3)))
+
+
+def _euler2mat_sxyz(ai, aj, ak):
+    # static-frame x-y-z Euler angles -> rotation matrix, i.e.
+    # transforms3d.euler.euler2mat(ai, aj, ak, axes='sxyz') written out
+    si, sj, sk = math.sin(ai), math.sin(aj), math.sin(ak)
+    ci, cj, ck = math.cos(ai), math.cos(aj), math.cos(ak)
+    cc, cs = ci * ck, ci * sk
+    sc, ss = si * ck, si * sk
+    return np.array([[cj * ck, sj * sc - cs, sj * cc + ss],
+                     [cj * sk, sj * ss + cc, sj * cs - sc],
+                     [-sj, cj * si, cj * ci]])
+
+
+def _mat2euler_sxyz(M):
+    # inverse of _euler2mat_sxyz, i.e. transforms3d.euler.mat2euler(axes='sxyz')
+    cy = math.sqrt(M[0, 0] * M[0, 0] + M[1, 0] * M[1, 0])
+    if cy > np.finfo(float).eps * 4.:
+        ax = math.atan2(M[2, 1], M[2, 2])
+        ay = math.atan2(-M[2, 0], cy)
+        az = math.atan2(M[1, 0], M[0, 0])
+    else:
+        ax = math.atan2(-M[1, 2], M[1, 1])
+        ay = math.atan2(-M[2, 0], cy)
+        az = 0.0
+    return ax, ay, az
+
+
 def get_camera_rot_matrix(view_dict, flip_xy=False):
     return get_camera_matrix(view_dict, flip_xy=flip_xy)[:3, :3]
 
@@ -472,8 +740,9 @@ def rotate_world_to_cam(points, view_dict):
 def get_camera_matrix(view_dict, flip_xy=False):
     position = view_dict['camera_location']
     rotation_euler = view_dict['camera_rotation_final']
-    R = transforms3d.euler.euler2mat(*rotation_euler, axes='sxyz')
-    camera_matrix = transforms3d.affines.compose(position, R, np.ones(3))
+    camera_matrix = np.eye(4)
+    camera_matrix[:3, :3] = _euler2mat_sxyz(*rotation_euler)
+    camera_matrix[:3, 3] = position
 
     if flip_xy:
         # For some reason the x and y are flipped in room layout
@@ -494,10 +763,8 @@ def get_room_layout_cam_mat_and_ranges(view_dict, make_x_major=False):
         return camera_matrix, ranges
     # print(world_points[:,-1])
     # print(view_dict['camera_location'])
-    axes_xyz = np.eye(3)
-    apply_90_deg_rot_k_times = [
-        transforms3d.axangles.axangle2mat(axes_xyz[-1], k * math.pi / 2)
-        for k in range(4)]
+    axes_xyz = _AXES_XYZ
+    apply_90_deg_rot_k_times = _APPLY_90_DEG_ROT_K_TIMES
 
     def make_world_x_major(view_dictx):
         """ Rotates the world coords so that the -z direction of the camera
@@ -511,7 +778,8 @@ def get_room_layout_cam_mat_and_ranges(view_dict, make_x_major=False):
             degrees_away = math.degrees(
                 math.acos(np.dot(global_x_in_cam, -axes_xyz[2]))
             )
-            best = min(best, (degrees_away, np.linalg.inv(world_rotx)))  # python is neat
+            # the inverse of a rotation matrix is its transpose
+            best = min(best, (degrees_away, world_rotx.T))  # python is neat
             # if abs(degrees_away) < 45.:
             #     return np.linalg.inv(world_rot)
         return best[-1]
@@ -546,13 +814,12 @@ def point_info2room_layout(label_path):
         print(f'corrupted: {json_file}!')
         raise
 
-    def homogenize(M):
-        return np.concatenate([M, np.ones((M.shape[0], 1))], axis=1)
-
     def convert_world_to_cam(points, cam_mat=None):
-        new_points = points.T
-        homogenized_points = homogenize(new_points)
-        new_points = np.dot(homogenized_points, np.linalg.inv(cam_mat).T)[:, :3]
+        # closed-form inverse of the rigid transform, R^T (p - t): skips the
+        # 4x4 np.linalg.inv and the homogeneous-coordinate round-trip
+        R = cam_mat[:3, :3]
+        t = cam_mat[:3, 3]
+        new_points = (points.T - t) @ R
         return new_points
 
     mean = np.array([-1.64378987e-02, 7.03680296e-02, -2.72496318e+00,
@@ -563,8 +830,9 @@ def point_info2room_layout(label_path):
                     2.80763433, 1.92678054, 0.89655357])
 
     camera_matrix, bb = get_room_layout_cam_mat_and_ranges(data, make_x_major=True)
-    camera_matrix_euler = transforms3d.euler.mat2euler(camera_matrix[:3, :3], axes='sxyz')
-    vertices = np.array(list(itertools.product(*bb)))
+    camera_matrix_euler = _mat2euler_sxyz(camera_matrix[:3, :3])
+    # fancy-index the 8 corners instead of materializing itertools.product
+    vertices = np.asarray(bb)[np.arange(3), _CUBE_IDX]
     vertices_cam = convert_world_to_cam(vertices.T, camera_matrix)
     cube_center = np.mean(vertices_cam, axis=0)
 
@@ -579,7 +847,7 @@ def point_info2room_layout(label_path):
 
 def room_layout(label_path):
     try:
-        bbox_cam = np.load(label_path)
+        bbox_cam = np.load(label_path, mmap_mode='r')
     except:
         raise Exception(f'corrupted: {label_path}!')
     return bbox_cam
@@ -589,9 +857,15 @@ def room_layout(label_path):
 # Autoencoder & Normal #
 ########################
 
-def load_raw_img_label(label_path):
+def load_raw_img_label(label_path, target_hw=None):
     try:
-        image = io.imread(label_path)
+        # decode with PIL directly instead of going through skimage's
+        # plugin dispatcher (which round-trips through PIL anyway); when the
+        # consumer is going to shrink to target_hw, draft-decode at low res
+        if target_hw is not None:
+            image = np.asarray(open_image_for_resize(label_path, target_hw))
+        else:
+            image = np.asarray(Image.open(label_path))
     except:
         raise Exception(f'corrupted: {label_path}!')
     return image
@@ -610,11 +884,11 @@ def semantic_segment_label(label_path):
         pixels: size num_pixels x 3 numpy array
     """
     try:
-        label = io.imread(label_path)
+        label = np.array(Image.open(label_path))
     except:
         raise Exception(f'corrupted: {label_path}!')
-    label[label == 0] = 1
-    label = label - 1
+    # fused remap of {0 -> 1; x -> x - 1}: decrement in place where nonzero
+    np.subtract(label, 1, out=label, where=label > 0)
 
     return label
 
@@ -628,29 +902,41 @@ def random_jigsaw_permutation(label_path, classes=1000):
     return rand_ind
 
 
+@functools.lru_cache(maxsize=None)
 def get_permutation_set(mode, classes=1000):
+    # cached: every MakeJigsawPuzzle instance in every worker reuses one load
     assert mode in ['max', 'avg']
     permutation_path = os.path.join(os.path.abspath(os.path.dirname(__file__)),
                                     f'permutations_hamming_{mode}_{classes}.npy')
-    return np.load(permutation_path)
+    permutations = np.load(permutation_path)
+    permutations.flags.writeable = False
+    return permutations
+
+
+@functools.lru_cache(maxsize=None)
+def _base_tile_offsets(unitH, unitW):
+    # grid origin of each of the 9 tile positions; permutation-independent,
+    # so it only depends on the tile unit size and is computed once
+    offsets = np.array([[(p // 3) * unitH, (p % 3) * unitW] for p in range(9)],
+                       dtype=np.int32)
+    offsets.flags.writeable = False
+    return offsets
 
 
-def image2tiles(img, permutation, new_dims):
+def image2tiles(img, permutation, new_dims, base_offsets=None):
     """
     Generate the 9 pieces input for Jigsaw task. (added tile gaps & chromatic aberration)
 
     Parameters:
     -----------
         img (PIL Image): Image to be cropped (3, 255, 255)
+        base_offsets: optional (9, 2) grid-origin table from _base_tile_offsets
 
     Return:
     -----------
-        img_tiles: 9 PIL image pieces
+        img_tiles: 9 (endH, endW, C) numpy views into the image, zero-copy
     """
 
-    if len(permutation) != 9:
-        raise ValueError(f'Target permutation of Jigsaw is supposed to have lenght 9, getting {len(permutation)} here')
-
     He, Wi = img.size  # (255, 255)
 
     unitH = int(He / 3)  # 85
@@ -659,21 +945,33 @@ def image2tiles(img, permutation, new_dims):
     endH = new_dims[0]  # 64
     endW = new_dims[1]  # 64
 
+    # one PIL->numpy conversion; every tile below is a zero-copy slice of it,
+    # instead of 9 F.crop calls each allocating a new PIL image
+    arr = np.asarray(img)
+    # all 18 jitter offsets in a single draw instead of 18 scalar calls; torch's
+    # global RNG is the one the DataLoader reseeds per worker, so a flat draw
+    # over both spans plus a divmod keeps the streams independent across workers
+    spanH = unitH - endH + 1
+    spanW = unitW - endW + 1
+    flat = torch.randint(0, spanH * spanW, (9,)).numpy()
+    offsets = np.stack((flat // spanW, flat % spanW), axis=1)
+    if base_offsets is None:
+        base_offsets = _base_tile_offsets(unitH, unitW)
+    # one vectorized gather of the permuted grid origins plus the jitter
+    bases = base_offsets[np.asarray(permutation)] + offsets
+
     img_tiles = []
 
     for n in range(9):
-        pos = permutation[n]
-        posH = int(pos // 3) * unitH
-        posW = int(pos % 3) * unitW
-        pos_i = torch.randint(0, unitH - endH + 1, size=(1,)).item()
-        pos_j = torch.randint(0, unitW - endW + 1, size=(1,)).item()
-        img_tiles.append(F.crop(img, posH + pos_i, posW + pos_j, endH, endW))
+        posH, posW = int(bases[n, 0]), int(bases[n, 1])
+        img_tiles.append(arr[posH: posH + endH, posW: posW + endW])
 
     return img_tiles
 
 
 class MakeJigsawPuzzle(object):
-    def __init__(self, classes, mode, tile_dim=(64, 64), centercrop=None, norm=True, totensor=True):
+    def __init__(self, classes, mode, tile_dim=(64, 64), centercrop=None, norm=True, totensor=True,
+                 image_size=(255, 255)):
         self.classes = classes
         self.mode = mode  # ['max', 'avg']
         self.permutation_set = get_permutation_set(classes=classes, mode=mode)
@@ -681,6 +979,9 @@ class MakeJigsawPuzzle(object):
         self.centercrop = centercrop  # float
         self.image_norm = norm  # normalize separate images
         self.totensor = totensor
+        # tile grid origins for the expected image size, resolved once here
+        self.image_size = image_size
+        self._base_offsets = _base_tile_offsets(image_size[0] // 3, image_size[1] // 3)
 
     def __call__(self, sample, task_name):
         """
@@ -702,24 +1003,40 @@ class MakeJigsawPuzzle(object):
                 image = F.center_crop(image, (He * self.centercrop, Wi * self.centercrop))
                 image = F.resize(image, (He, Wi), Image.BILINEAR)
 
-            pil_image_tiles = image2tiles(image, permutation, self.tile_dim)
+            base = self._base_offsets if (He, Wi) == self.image_size else None
+            image_tiles = image2tiles(image, permutation, self.tile_dim, base_offsets=base)
             if self.totensor:
-                raws = torch.empty((9, 3, self.tile_dim[0], self.tile_dim[1]), dtype=torch.float32)
-                images = torch.empty((9, 3, self.tile_dim[0], self.tile_dim[1]), dtype=torch.float32)
-                for i, tile in enumerate(pil_image_tiles):
-                    tile_tensor = F.to_tensor(tile)
-                    raws[i, :, :, :] = tile_tensor
-                    if self.image_norm:
-                        mean = tile_tensor.mean((-2, -1))
-                        std = tile_tensor.std((-2, -1)) + 0.0001
-                        tile_tensor = F.normalize(tile_tensor, mean, std)
-                    images[i, :, :, :] = tile_tensor
+                # stack the tile views into one (9, 3, 64, 64) batch and run
+                # the uint8->float scale and per-tile normalization as batched
+                # ops instead of 9 to_tensor/mean/std/normalize calls
+                stacked = torch.from_numpy(np.stack(image_tiles))
+                raws = stacked.permute(0, 3, 1, 2).contiguous().to(torch.float32).mul_(1.0 / 255.0)
+                if self.image_norm:
+                    mean = raws.mean(dim=(-2, -1), keepdim=True)
+                    std = raws.std(dim=(-2, -1), keepdim=True).add_(0.0001)
+                    images = raws.sub(mean).div_(std)
+                else:
+                    images = raws.clone()
             else:
-                raws = pil_image_tiles
-                images = pil_image_tiles
+                raws = image_tiles
+                images = image_tiles
 
             return {'raw': raws,
                     'image': images,
                     'label': permutation_idx}
         else:
             raise TypeError("Only jigsaw can use MakeJigsawPuzzle")
+
+
+# Warm the label-metadata caches at import: with the DataLoader's default fork
+# start method the parent process loads each array once and every worker then
+# shares those read-only pages copy-on-write, instead of N private cold loads.
+for _task in ('class_object', 'class_scene'):
+    for _final5k in (False, True):
+        _load_selection(_task, _final5k)
+        _selection_index(_task, _final5k)
+        get_synset(_task, selected=True, final5k=_final5k)
+# same call shape as MakeJigsawPuzzle.__init__: lru_cache keys positional and
+# keyword calls separately, so warming positionally would leave a cold entry
+get_permutation_set(classes=1000, mode='max')
+del _task, _final5k